@@ -1,15 +1,42 @@
 import os
+
+# BLAS en un solo hilo: para lotes pequeños el pool de hilos solo añade
+# latencia. Despliegues orientados a throughput pueden fijar estas variables
+# al número de núcleos y apoyarse en el micro-batching.
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+import math
+import threading
 import joblib
 import numpy as np
 import json
-from flask import Flask, request, jsonify
-from pydantic import BaseModel, ValidationError
+import orjson
+from scipy.special import expit
+from numba import njit
+from flask import Flask, Response, request
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import List
 from loguru import logger
 
+try:
+    from api.batching import BatchScheduler
+except ImportError:  # Ejecución directa: python api/app.py
+    from batching import BatchScheduler
+
 # Configuración de la aplicación
 app = Flask(__name__)
 
+# Configuración del micro-batching
+BATCH_SIZE = int(os.environ.get('BATCH_SIZE', 32))
+BATCH_TIMEOUT_MS = float(os.environ.get('BATCH_TIMEOUT_MS', 2))
+
+# Tamaño de los buffers de trabajo reutilizados por hilo
+MAX_BATCH = max(BATCH_SIZE, 1024)
+
+# Máximo de filas aceptadas por /predict_batch en una sola petición
+MAX_BATCH_ROWS = int(os.environ.get('MAX_BATCH_ROWS', 1024))
+
 # Configurar logging
 os.makedirs('logs', exist_ok=True)
 logger.add("logs/api.log", rotation="10 MB", level="INFO")
@@ -19,9 +46,24 @@ model = None
 scaler = None
 model_metadata = {}
 
+# Pesos de la regresión logística con el escalado ya plegado
+_W = None
+_b = None
+
+# Constantes derivadas de los metadatos, fijadas al cargar el modelo
+_EXPECTED_FEATURES = 30
+_CLASS_NAMES = np.array(['Benigno', 'Maligno'])
+
+# Buffer por hilo para la fila de entrada (evita una asignación por petición).
+# Es seguro reutilizarlo: submit() bloquea hasta que el lote ya se ha copiado.
+_BUF = threading.local()
+
+# Buffers de trabajo por hilo para el kernel de inferencia
+_SCRATCH = threading.local()
+
 def load_model_artifacts():
     """Carga el modelo, escalador y metadatos usando rutas absolutas."""
-    global model, scaler, model_metadata
+    global model, scaler, model_metadata, _W, _b, _EXPECTED_FEATURES
     
     # Obtener la ruta absoluta del directorio del script actual
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -33,18 +75,29 @@ def load_model_artifacts():
     
     try:
         # Cargar modelo
-        model = joblib.load(MODEL_PATH)
+        # mmap de solo lectura: los arrays del modelo se comparten entre workers
+        model = joblib.load(MODEL_PATH, mmap_mode='r')
         logger.info(f"Modelo cargado desde: {MODEL_PATH}")
         
         # Cargar escalador
-        scaler = joblib.load(SCALER_PATH)
+        scaler = joblib.load(SCALER_PATH, mmap_mode='r')
         logger.info(f"Escalador cargado desde: {SCALER_PATH}")
         
+        # Plegar el escalador en los pesos: ((x - mean) / scale) @ coef.T + b
+        # equivale a x @ (coef / scale).T + (b - sum(coef * mean / scale))
+        coef = model.coef_[0].astype(np.float64)
+        mean = scaler.mean_.astype(np.float64)
+        inv_scale = 1.0 / scaler.scale_.astype(np.float64)
+        # En float64: todos los caminos de inferencia acumulan con esta precisión
+        _W = coef * inv_scale
+        _b = float(model.intercept_[0] - np.dot(_W, mean))
+        
         # Cargar metadatos si existen
         if os.path.exists(METADATA_PATH):
             with open(METADATA_PATH, 'r') as f:
                 model_metadata = json.load(f)
             logger.info(f"Metadatos cargados desde: {METADATA_PATH}")
+        _EXPECTED_FEATURES = int(model_metadata.get('feature_count', 30))
         
         logger.info(f"Modelo cargado exitosamente. Precisión: {model_metadata.get('accuracy', 'N/A')}")
         return True
@@ -56,10 +109,106 @@ def load_model_artifacts():
         logger.error(f"Error cargando artefactos del modelo: {e}")
         return False
 
+@njit
+def _all_finite(a):
+    """True si no hay NaN ni infinitos; termina en el primer valor inválido."""
+    for v in a.flat:
+        if not math.isfinite(v):
+            return False
+    return True
+
+@njit(fastmath=True)
+def _predict_kernel(X, W, b, proba, pred):
+    """Camino de predicción completo (escalado + logit + sigmoide) para un lote pequeño."""
+    for r in range(X.shape[0]):
+        s = b
+        for i in range(X.shape[1]):
+            s += X[r, i] * W[i]
+        if s >= 0:
+            p1 = 1.0 / (1.0 + math.exp(-s))
+        else:
+            e = math.exp(s)
+            p1 = e / (1.0 + e)
+        proba[r, 1] = p1
+        proba[r, 0] = 1.0 - p1
+        pred[r] = s > 0
+
+def _scratch(n):
+    """Devuelve vistas de tamaño n sobre los buffers del hilo.
+
+    Los buffers tienen tamaño fijo MAX_BATCH; por encima de ese tamaño se
+    reservan arrays nuevos para la llamada, de modo que un lote grande no
+    deja memoria retenida en el hilo.
+    """
+    if n > MAX_BATCH:
+        return (np.empty(n, dtype=np.float64), np.empty((n, 2), dtype=np.float64),
+                np.empty(n, dtype=bool))
+    if not hasattr(_SCRATCH, 'z'):
+        _SCRATCH.z = np.empty(MAX_BATCH, dtype=np.float64)
+        _SCRATCH.proba = np.empty((MAX_BATCH, 2), dtype=np.float64)
+        _SCRATCH.pred = np.empty(MAX_BATCH, dtype=bool)
+    return _SCRATCH.z[:n], _SCRATCH.proba[:n], _SCRATCH.pred[:n]
+
+def infer(data):
+    """Devuelve (predicciones, probabilidades) para una matriz (N, n_features).
+
+    Los resultados son vistas sobre buffers del hilo: deben consumirse antes
+    de la siguiente llamada desde el mismo hilo. Ambos caminos acumulan en
+    float64 y etiquetan con z > 0, así que una fila obtiene el mismo resultado
+    sea cual sea el tamaño del lote en el que caiga.
+    """
+    n = data.shape[0]
+    z, prediction_proba, prediction = _scratch(n)
+
+    # Lotes del tamaño del micro-batching (incluida una sola fila): kernel compilado
+    if n <= BATCH_SIZE:
+        _predict_kernel(data, _W, _b, prediction_proba, prediction)
+        return prediction, prediction_proba
+
+    # Lotes grandes: escalado + regresión logística en un único producto matricial
+    np.matmul(data, _W, out=z)
+    z += _b
+    expit(z, out=prediction_proba[:, 1])
+    np.subtract(1.0, prediction_proba[:, 1], out=prediction_proba[:, 0])
+    np.greater(z, 0, out=prediction)
+    return prediction, prediction_proba
+
+def predict_rows(data):
+    """Inferencia vectorizada sobre una matriz (N, n_features)."""
+    prediction, prediction_proba = infer(data)
+
+    # Conversión a tipos de Python de una sola vez por lote
+    numeric = prediction.view(np.int8)
+    labels = _CLASS_NAMES.take(numeric).tolist()
+    probas = np.round(prediction_proba.astype(np.float64), 4).tolist()
+
+    return [
+        {
+            "prediction": label,
+            "confidence": {"Benigno": p0, "Maligno": p1},
+            "prediction_numeric": pred
+        }
+        for label, pred, (p0, p1) in zip(labels, numeric.tolist(), probas)
+    ]
+
+def warm_up():
+    """Predicciones de prueba: compila los kernels e inicializa BLAS antes de la primera petición."""
+    dummy = np.zeros((BATCH_SIZE + 1, _EXPECTED_FEATURES), dtype=np.float32)
+    _all_finite(dummy)
+    predict_rows(dummy[:1])  # Kernel compilado (N <= BATCH_SIZE)
+    predict_rows(dummy)      # Producto matricial (N > BATCH_SIZE)
+
 # Cargar modelo al inicializar
 model_loaded = load_model_artifacts()
+if model_loaded:
+    try:
+        warm_up()
+    except Exception as e:
+        logger.warning(f"Error en el calentamiento del modelo: {e}")
+batch_scheduler = BatchScheduler(predict_rows, BATCH_SIZE, BATCH_TIMEOUT_MS)
 
-# Validación con Pydantic
+# Esquemas de entrada; la validación en caliente usa adaptadores estrictos
+# construidos a partir de sus tipos
 class PredictionInput(BaseModel):
     features: List[float]
     
@@ -74,18 +223,102 @@ class PredictionInput(BaseModel):
             }
         }
 
-    def validate_features(self):
-        """Validación adicional."""
-        expected_count = model_metadata.get('feature_count', 30)
-        if len(self.features) != expected_count:
-            raise ValueError(f"Se esperaban {expected_count} features, recibidas {len(self.features)}")
-        
-        features_array = np.array(self.features)
-        if np.any(np.isnan(features_array)) or np.any(np.isinf(features_array)):
-            raise ValueError("Features contienen valores inválidos")
+class BatchPredictionInput(BaseModel):
+    features: List[List[float]]
 
-    def to_numpy(self):
-        return np.array(self.features).reshape(1, -1)
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "features": [PredictionInput.Config.json_schema_extra["example"]["features"]]
+            }
+        }
+
+class InvalidInputError(Exception):
+    """El cuerpo JSON no cumple el esquema de entrada.
+
+    `errors` conserva el formato de pydantic (type, loc, msg) para la respuesta 422.
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+    @classmethod
+    def single(cls, error_type, msg, loc=('features',)):
+        return cls([{"type": error_type, "loc": list(loc), "msg": msg}])
+
+# Modo estricto: rechaza cadenas y booleanos en lugar de convertirlos
+_features_adapter = TypeAdapter(PredictionInput.model_fields['features'].annotation)
+_batch_features_adapter = TypeAdapter(BatchPredictionInput.model_fields['features'].annotation)
+
+class BatchTooLargeError(Exception):
+    """El lote supera MAX_BATCH_ROWS filas."""
+
+def _check_types(adapter, features):
+    try:
+        adapter.validate_python(features, strict=True)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_input=False)
+        for error in errors:
+            error['loc'] = ['features', *error['loc']]
+        raise InvalidInputError(errors)
+
+def read_json():
+    """Decodifica el cuerpo de la petición con orjson (None si está vacío)."""
+    raw = request.get_data()
+    if not raw:
+        return None
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise ValueError("JSON inválido")
+
+def json_response(payload, status=200):
+    """Serializa la respuesta con orjson."""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+def _get_features(json_data):
+    features = json_data.get('features') if isinstance(json_data, dict) else None
+    if not isinstance(features, list):
+        if not isinstance(json_data, dict) or 'features' not in json_data:
+            raise InvalidInputError.single('missing', 'Field required')
+        raise InvalidInputError.single('list_type', 'Input should be a valid list')
+    return features
+
+def parse_features(json_data):
+    """Valida una fila de features y la copia en el buffer float32 del hilo."""
+    features = _get_features(json_data)
+    _check_types(_features_adapter, features)
+    if len(features) != _EXPECTED_FEATURES:
+        raise ValueError(f"Se esperaban {_EXPECTED_FEATURES} features, recibidas {len(features)}")
+
+    buf = getattr(_BUF, 'arr', None)
+    if buf is None:
+        buf = _BUF.arr = np.empty((1, _EXPECTED_FEATURES), dtype=np.float32)
+    buf[0, :] = features
+
+    if not _all_finite(buf):
+        raise ValueError("Features contienen valores inválidos")
+    return buf
+
+def parse_batch_features(json_data):
+    """Valida la forma (N, n_features) y devuelve la matriz float32."""
+    features = _get_features(json_data)
+    if len(features) > MAX_BATCH_ROWS:
+        raise BatchTooLargeError(f"El lote admite como máximo {MAX_BATCH_ROWS} filas, recibidas {len(features)}")
+    _check_types(_batch_features_adapter, features)
+    try:
+        features_array = np.asarray(features, dtype=np.float32)
+    except ValueError:
+        raise InvalidInputError.single('value_error', 'Las filas de features deben tener igual longitud')
+
+    if features_array.ndim != 2 or features_array.shape[0] == 0:
+        raise ValueError("Se esperaba una lista no vacía de filas de features")
+    if features_array.shape[1] != _EXPECTED_FEATURES:
+        raise ValueError(f"Se esperaban {_EXPECTED_FEATURES} features por fila, recibidas {features_array.shape[1]}")
+    if not _all_finite(features_array):
+        raise ValueError("Features contienen valores inválidos")
+    return features_array
 
 # Rutas de la API
 @app.route('/', methods=['GET'])
@@ -98,52 +331,107 @@ def health_check():
         "model_accuracy": model_metadata.get('accuracy', 'N/A')
     }
     logger.info("Health check solicitado")
-    return jsonify(status), 200 if model_loaded else 503
+    return json_response(status, 200 if model_loaded else 503)
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Endpoint de predicción."""
     if not model_loaded:
         logger.error("Intento de predicción sin modelo")
-        return jsonify({"error": "Modelo no disponible"}), 503
+        return json_response({"error": "Modelo no disponible"}, 503)
 
-    json_data = request.get_json()
-    if not json_data:
-        return jsonify({"error": "No se proporcionaron datos JSON"}), 400
+    try:
+        json_data = read_json()
+        if not json_data:
+            return json_response({"error": "No se proporcionaron datos JSON"}, 400)
+
+        # Validación
+        data_to_predict = parse_features(json_data)
+
+        # Predicción (agrupada con otras peticiones concurrentes)
+        result = batch_scheduler.submit(data_to_predict)
+        
+        logger.info(f"Predicción: {result['prediction']}")
+        return json_response(result)
+
+    except InvalidInputError as e:
+        logger.warning(f"Error de validación: {e}")
+        return json_response({"error": "Datos inválidos", "details": e.errors}, 422)
+    except ValueError as e:
+        logger.warning(f"Error en datos: {str(e)}")
+        return json_response({"error": str(e)}, 400)
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}")
+        return json_response({"error": "Error interno del servidor"}, 500)
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Endpoint de predicción por lotes."""
+    if not model_loaded:
+        logger.error("Intento de predicción sin modelo")
+        return json_response({"error": "Modelo no disponible"}, 503)
 
     try:
+        json_data = read_json()
+        if not json_data:
+            return json_response({"error": "No se proporcionaron datos JSON"}, 400)
+
         # Validación
-        input_data = PredictionInput(**json_data)
-        input_data.validate_features()
+        data_to_predict = parse_batch_features(json_data)
+
+        # Predicción sobre la matriz completa
+        results = predict_rows(data_to_predict)
+
+        logger.info(f"Predicción por lotes: {len(results)} muestras")
+        return json_response({"predictions": results})
+
+    except BatchTooLargeError as e:
+        logger.warning(f"Lote demasiado grande: {e}")
+        return json_response({"error": str(e)}, 413)
+    except InvalidInputError as e:
+        logger.warning(f"Error de validación: {e}")
+        return json_response({"error": "Datos inválidos", "details": e.errors}, 422)
+    except ValueError as e:
+        logger.warning(f"Error en datos: {str(e)}")
+        return json_response({"error": str(e)}, 400)
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}")
+        return json_response({"error": "Error interno del servidor"}, 500)
 
-        # Predicción
-        data_to_predict = input_data.to_numpy()
+@app.route('/verify', methods=['POST'])
+def verify():
+    """Endpoint de depuración: compara el kernel fusionado con scikit-learn."""
+    if not model_loaded:
+        return json_response({"error": "Modelo no disponible"}, 503)
+
+    try:
+        json_data = read_json()
+        if not json_data:
+            return json_response({"error": "No se proporcionaron datos JSON"}, 400)
+
+        data_to_predict = parse_batch_features(json_data)
+
+        fused_pred, fused_proba = infer(data_to_predict)
         data_scaled = scaler.transform(data_to_predict)
-        
-        prediction = model.predict(data_scaled)
-        prediction_proba = model.predict_proba(data_scaled)
+        reference_pred = model.predict(data_scaled)
+        reference_proba = model.predict_proba(data_scaled)
 
         result = {
-            "prediction": "Maligno" if int(prediction[0]) == 1 else "Benigno",
-            "confidence": {
-                "Benigno": round(float(prediction_proba[0][0]), 4),
-                "Maligno": round(float(prediction_proba[0][1]), 4)
-            },
-            "prediction_numeric": int(prediction[0])
+            "max_abs_diff": float(np.max(np.abs(fused_proba - reference_proba))),
+            "predictions_match": bool(np.array_equal(fused_pred, reference_pred))
         }
-        
-        logger.info(f"Predicción: {result['prediction']}")
-        return jsonify(result), 200
+        return json_response(result)
 
-    except ValidationError as e:
-        logger.warning(f"Error de validación: {e.errors()}")
-        return jsonify({"error": "Datos inválidos", "details": e.errors()}), 422
+    except BatchTooLargeError as e:
+        return json_response({"error": str(e)}, 413)
+    except InvalidInputError as e:
+        return json_response({"error": "Datos inválidos", "details": e.errors}, 422)
     except ValueError as e:
-        logger.warning(f"Error en datos: {str(e)}")
-        return jsonify({"error": str(e)}), 400
+        return json_response({"error": str(e)}, 400)
     except Exception as e:
         logger.error(f"Error inesperado: {e}")
-        return jsonify({"error": "Error interno del servidor"}), 500
+        return json_response({"error": "Error interno del servidor"}, 500)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Solo para desarrollo local; en producción: gunicorn -c gunicorn_conf.py api.app:app
+    app.run(host='0.0.0.0', port=5000)
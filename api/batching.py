@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+import numpy as np
+from loguru import logger
+
+
+class BatchScheduler:
+    """Agrupa peticiones concurrentes en un único lote de inferencia.
+
+    Cada petición encola su fila de features y espera su resultado; un hilo
+    de fondo acumula hasta `batch_size` filas o `batch_timeout_ms` milisegundos,
+    ejecuta una sola inferencia vectorizada y reparte los resultados.
+    """
+
+    def __init__(self, infer_fn, batch_size=32, batch_timeout_ms=2.0):
+        # infer_fn recibe una matriz (N, n_features) y devuelve N resultados
+        self.infer_fn = infer_fn
+        self.batch_size = max(1, int(batch_size))
+        self.batch_timeout = max(0.0, float(batch_timeout_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        # Arranque perezoso: los hilos no sobreviven a un fork (gunicorn),
+        # por eso el worker se crea en el proceso que atiende las peticiones
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="batch-scheduler", daemon=True
+                )
+                self._worker.start()
+                logger.info(
+                    f"Micro-batching activo: batch_size={self.batch_size}, "
+                    f"batch_timeout={self.batch_timeout * 1000:.1f} ms"
+                )
+
+    def submit(self, features, timeout=30.0):
+        """Encola una fila de features y bloquea hasta obtener su resultado."""
+        self._ensure_worker()
+        event = threading.Event()
+        slot = {}
+        self._queue.put((features, event, slot))
+
+        if not event.wait(timeout):
+            raise TimeoutError("Tiempo de espera agotado en la cola de inferencia")
+        if "error" in slot:
+            raise slot["error"]
+        return slot["result"]
+
+    def _collect(self):
+        """Bloquea hasta la primera petición y agrupa las que ya estén en cola.
+
+        Solo se espera la ventana `batch_timeout` si hay tráfico concurrente
+        (más de una petición encolada); una petición aislada no añade latencia.
+        """
+        items = [self._queue.get()]
+
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if len(items) > 1:
+            deadline = time.monotonic() + self.batch_timeout
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                batch = np.vstack([features for features, _, _ in items])
+                results = self.infer_fn(batch)
+                for (_, _, slot), result in zip(items, results):
+                    slot["result"] = result
+            except Exception as e:
+                logger.error(f"Error en inferencia por lotes: {e}")
+                for _, _, slot in items:
+                    slot["error"] = e
+            finally:
+                for _, event, _ in items:
+                    event.set()
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.datasets import load_breast_cancer
 import os
@@ -9,18 +10,24 @@ def create_breast_cancer_csv():
     
     # Crear DataFrame
     df = pd.DataFrame(data.data, columns=data.feature_names)
-    df['diagnosis'] = ['M' if x == 1 else 'B' for x in data.target]
+    df['diagnosis'] = np.where(data.target == 1, 'M', 'B')
     
     # Agregar columna id (como en el dataset original)
-    df.insert(0, 'id', range(len(df)))
+    df.insert(0, 'id', np.arange(len(df), dtype=np.int32))
     
-    # Agregar columna vacía (como en el original)
-    df['Unnamed: 32'] = None
-    
-    # Guardar CSV
+    # Guardar CSV (6 cifras significativas bastan: el dataset no tiene más),
+    # con la columna vacía del original
     output_path = os.path.join(os.path.dirname(__file__), 'breast-cancer.csv')
-    df.to_csv(output_path, index=False)
+    df.assign(**{'Unnamed: 32': pd.Series(dtype='object')}).to_csv(
+        output_path, index=False, float_format='%.6g'
+    )
     print(f"Dataset guardado en: {output_path}")
+    
+    # Guardar Parquet (columnar y tipado) para recargas rápidas en entrenamiento;
+    # se escribe después del CSV para que train.py lo considere al día
+    parquet_path = os.path.join(os.path.dirname(__file__), 'breast-cancer.parquet')
+    df.to_parquet(parquet_path, index=False, compression='zstd')
+    print(f"Dataset guardado en: {parquet_path}")
     print(f"Forma del dataset: {df.shape}")
     print(f"Distribución diagnósticos:\n{df['diagnosis'].value_counts()}")
 
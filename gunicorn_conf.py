@@ -0,0 +1,15 @@
+import os
+
+# Configuración de gunicorn para producción
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+timeout = 60
+
+# El modelo se carga una sola vez antes del fork; con mmap_mode='r' los
+# workers comparten las páginas del modelo en lugar de duplicarlas
+preload_app = True
+
+# Un worker por núcleo y varios hilos por worker para que el micro-batching
+# pueda agrupar peticiones concurrentes
+workers = int(os.environ.get('GUNICORN_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
@@ -1,18 +1,28 @@
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
 import json
 
 def load_and_validate_data(data_path):
-    """Carga y valida los datos del dataset."""
-    if not os.path.exists(data_path):
+    """Carga y valida los datos del dataset (usa la versión Parquet si está al día)."""
+    parquet_path = os.path.splitext(data_path)[0] + '.parquet'
+    csv_exists = os.path.exists(data_path)
+    # Un Parquet más antiguo que el CSV es una copia obsoleta: se ignora
+    if os.path.exists(parquet_path) and (
+        not csv_exists or os.path.getmtime(parquet_path) >= os.path.getmtime(data_path)
+    ):
+        loaded_path = parquet_path
+        df = pd.read_parquet(parquet_path)
+    elif csv_exists:
+        loaded_path = data_path
+        df = pd.read_csv(data_path)
+    else:
         raise FileNotFoundError(f"Dataset no encontrado en: {data_path}")
-    
-    df = pd.read_csv(data_path)
+    print(f"📂 Dataset cargado desde: {loaded_path}")
     
     if df.empty:
         raise ValueError("El dataset está vacío")
@@ -21,6 +31,44 @@ def load_and_validate_data(data_path):
     
     return df
 
+def confusion_counts(y_true, y_pred):
+    """Devuelve [tn, fp, fn, tp] de un problema binario en una sola pasada."""
+    codes = 2 * np.asarray(y_true, dtype=np.int64) + np.asarray(y_pred, dtype=np.int64)
+    return np.bincount(codes, minlength=4)
+
+def _safe_div(num, den):
+    return num / den if den else 0.0
+
+def classification_summary(cm, target_names):
+    """Reporte por clase (precisión, recall, F1, soporte) a partir de la matriz de confusión."""
+    tn, fp, fn, tp = cm
+    # (aciertos, predichos, reales) para cada clase
+    per_class = [(tn, tn + fn, tn + fp), (tp, tp + fp, tp + fn)]
+    total = int(cm.sum())
+
+    # Mismos anchos de columna que sklearn.metrics.classification_report
+    width = max(len(name) for name in list(target_names) + ['weighted avg'])
+    lines = [f"{'':>{width}} {'precision':>10}{'recall':>10}{'f1-score':>10}{'support':>10}", ""]
+    rows = []
+    for name, (hits, predicted, actual) in zip(target_names, per_class):
+        precision = _safe_div(hits, predicted)
+        recall = _safe_div(hits, actual)
+        f1 = _safe_div(2 * precision * recall, precision + recall)
+        rows.append((precision, recall, f1, int(actual)))
+        lines.append(f"{name:>{width}} {precision:>10.2f}{recall:>10.2f}{f1:>10.2f}{int(actual):>10}")
+
+    accuracy = _safe_div(tn + tp, total)
+    macro = [sum(r[i] for r in rows) / len(rows) for i in range(3)]
+    weighted = [_safe_div(sum(r[i] * r[3] for r in rows), total) for i in range(3)]
+    lines += [
+        "",
+        f"{'accuracy':>{width}} {'':>20}{accuracy:>10.2f}{total:>10}",
+        f"{'macro avg':>{width}} {macro[0]:>10.2f}{macro[1]:>10.2f}{macro[2]:>10.2f}{total:>10}",
+        f"{'weighted avg':>{width}} {weighted[0]:>10.2f}{weighted[1]:>10.2f}{weighted[2]:>10.2f}{total:>10}",
+        "",
+    ]
+    return "\n".join(lines)
+
 def main():
     print("🧠 Iniciando entrenamiento del modelo...")
     
@@ -67,11 +115,26 @@ def main():
     # Evaluación
     print("📊 Evaluando modelo...")
     y_pred = model.predict(X_test_scaled)
-    accuracy = accuracy_score(y_test, y_pred)
+    cm = confusion_counts(y_test, y_pred)
+    accuracy = (cm[0] + cm[3]) / cm.sum()
     
     print(f"\n✅ Precisión del modelo: {accuracy:.4f}")
     print("\n📋 Reporte detallado:")
-    print(classification_report(y_test, y_pred, target_names=['Benigno', 'Maligno']))
+    print(classification_summary(cm, ['Benigno', 'Maligno']))
+    
+    # Reducir los parámetros a float32 (suficiente para inferencia)
+    print("🔢 Convirtiendo parámetros a float32...")
+    model.coef_ = model.coef_.astype(np.float32)
+    model.intercept_ = model.intercept_.astype(np.float32)
+    scaler.mean_ = scaler.mean_.astype(np.float32)
+    scaler.scale_ = scaler.scale_.astype(np.float32)
+    
+    cm_float32 = confusion_counts(y_test, model.predict(scaler.transform(X_test)))
+    accuracy_float32 = (cm_float32[0] + cm_float32[3]) / cm_float32.sum()
+    if accuracy_float32 < accuracy:
+        raise ValueError(
+            f"La conversión a float32 reduce la precisión: {accuracy_float32:.4f} < {accuracy:.4f}"
+        )
     
     # Guardar artefactos
     print("💾 Guardando modelo y escalador...")
@@ -2,15 +2,51 @@ import requests
 import json
 import time
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://localhost:5000"
 
+# Sesión persistente: reutiliza conexiones HTTP (keep-alive) entre tests
+_SESSION = requests.Session()
+
+# requests.Session no garantiza ser thread-safe: una sesión por hilo en los
+# tests concurrentes
+_THREAD_LOCAL = threading.local()
+
+def _thread_session():
+    session = getattr(_THREAD_LOCAL, "session", None)
+    if session is None:
+        session = _THREAD_LOCAL.session = requests.Session()
+    return session
+
+VALID_FEATURES = [
+    17.99, 10.38, 122.8, 1001.0, 0.1184, 0.2776, 0.3001, 0.1471, 0.2419, 0.07871,
+    1.095, 0.9053, 8.589, 153.4, 0.006399, 0.04904, 0.05373, 0.01587, 0.03003, 0.006193,
+    25.38, 17.33, 184.6, 2019.0, 0.1622, 0.6656, 0.7119, 0.2654, 0.4601, 0.1189
+]
+
+# Fila benigna del dataset; interpolada con VALID_FEATURES da confianzas no saturadas
+BENIGN_FEATURES = [
+    9.72, 18.22, 60.73, 288.1, 0.0695, 0.02344, 0.0, 0.0, 0.1653, 0.06447,
+    0.3539, 4.885, 2.23, 21.69, 0.001713, 0.006736, 0.0, 0.0, 0.03799, 0.001688,
+    9.968, 20.83, 62.25, 303.8, 0.07117, 0.02729, 0.0, 0.0, 0.1909, 0.06559
+]
+
+def interpolated_rows(n, start=0.35, stop=0.6):
+    """Genera n filas entre BENIGN_FEATURES y VALID_FEATURES."""
+    steps = [start + (stop - start) * i / max(n - 1, 1) for i in range(n)]
+    return [
+        [b + (v - b) * t for b, v in zip(BENIGN_FEATURES, VALID_FEATURES)]
+        for t in steps
+    ]
+
 def wait_for_api(max_attempts=30):
     """Espera a que la API esté disponible."""
     print("⏳ Esperando que la API esté lista...")
     for i in range(max_attempts):
         try:
-            response = requests.get(f"{BASE_URL}/", timeout=2)
+            response = _SESSION.get(f"{BASE_URL}/", timeout=2)
             if response.status_code in [200, 503]:  # 503 si el modelo no está cargado
                 print("✅ API está respondiendo")
                 return True
@@ -28,7 +64,7 @@ def test_health_check():
         print("❌ API no está disponible después de esperar")
         sys.exit(1)
     
-    response = requests.get(f"{BASE_URL}/")
+    response = _SESSION.get(f"{BASE_URL}/")
     print(f"Status code: {response.status_code}")
     
     data = response.json()
@@ -41,15 +77,9 @@ def test_predict_valid_data():
     """Test con datos válidos."""
     print("\n🔍 Probando predicción con datos válidos...")
     
-    valid_data = {
-        "features": [
-            17.99, 10.38, 122.8, 1001.0, 0.1184, 0.2776, 0.3001, 0.1471, 0.2419, 0.07871,
-            1.095, 0.9053, 8.589, 153.4, 0.006399, 0.04904, 0.05373, 0.01587, 0.03003, 0.006193,
-            25.38, 17.33, 184.6, 2019.0, 0.1622, 0.6656, 0.7119, 0.2654, 0.4601, 0.1189
-        ]
-    }
+    valid_data = {"features": VALID_FEATURES}
     
-    response = requests.post(f"{BASE_URL}/predict", json=valid_data)
+    response = _SESSION.post(f"{BASE_URL}/predict", json=valid_data)
     print(f"Status code: {response.status_code}")
     
     if response.status_code != 200:
@@ -70,19 +100,117 @@ def test_predict_invalid_data():
     
     invalid_data = {"features": [1, 2, 3]}  # Muy pocas features
     
-    response = requests.post(f"{BASE_URL}/predict", json=invalid_data)
+    response = _SESSION.post(f"{BASE_URL}/predict", json=invalid_data)
     print(f"Status code: {response.status_code}")
     print(f"Respuesta: {response.text}")
     
     assert response.status_code in [400, 422]
+    
+    # Los errores de esquema devuelven la lista de errores de pydantic
+    response = _SESSION.post(f"{BASE_URL}/predict", json={"features": [1, "x", 3]})
+    assert response.status_code == 422
+    details = response.json()["details"]
+    assert isinstance(details, list)
+    assert details[0]["loc"] == ["features", 1]
     print("✅ Manejo de datos inválidos: PASSED")
 
+def test_predict_batch():
+    """Test de predicción por lotes."""
+    print("\n🔍 Probando predicción por lotes...")
+    
+    row = VALID_FEATURES
+    batch_data = {"features": [row] * 5}
+    
+    response = _SESSION.post(f"{BASE_URL}/predict_batch", json=batch_data)
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["predictions"]) == 5
+    
+    # Debe coincidir con la predicción individual
+    single = _SESSION.post(f"{BASE_URL}/predict", json={"features": row}).json()
+    for item in data["predictions"]:
+        assert item["prediction"] == single["prediction"]
+        assert item["prediction_numeric"] == single["prediction_numeric"]
+    
+    response = _SESSION.post(f"{BASE_URL}/predict_batch", json={"features": [row, [1, 2, 3]]})
+    assert response.status_code in [400, 422]
+    print("✅ Predicción por lotes: PASSED")
+
+def test_predict_batch_too_large():
+    """Test de rechazo de lotes por encima del límite de filas."""
+    print("\n🔍 Probando lote por encima del límite...")
+    
+    # Por encima del MAX_BATCH_ROWS por defecto (1024)
+    oversized_data = {"features": [VALID_FEATURES] * 2000}
+    
+    response = _SESSION.post(f"{BASE_URL}/predict_batch", json=oversized_data)
+    print(f"Status code: {response.status_code}")
+    
+    assert response.status_code == 413
+    assert "error" in response.json()
+    print("✅ Rechazo de lote demasiado grande: PASSED")
+
+def test_verify():
+    """Test de equivalencia numérica del kernel con scikit-learn."""
+    print("\n🔍 Probando /verify contra scikit-learn...")
+    
+    # 8 filas usan el kernel numba; 100 filas superan BATCH_SIZE (matmul)
+    for n_rows in (8, 100):
+        response = _SESSION.post(f"{BASE_URL}/verify", json={"features": interpolated_rows(n_rows)})
+        print(f"Status code ({n_rows} filas): {response.status_code}")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["predictions_match"] is True
+        assert data["max_abs_diff"] < 1e-5
+    
+    # Las filas deben cubrir ambas clases con confianzas intermedias
+    response = _SESSION.post(f"{BASE_URL}/predict_batch", json={"features": interpolated_rows(8)})
+    predictions = response.json()["predictions"]
+    assert len({item["prediction"] for item in predictions}) == 2
+    assert any(0.05 < item["confidence"]["Maligno"] < 0.95 for item in predictions)
+    print("✅ Verificación contra scikit-learn: PASSED")
+
+def test_concurrent_predict(n_requests=64, max_workers=32):
+    """Test de peticiones concurrentes (ejercita el micro-batching)."""
+    print(f"\n🔍 Probando {n_requests} predicciones concurrentes...")
+    
+    valid_data = {"features": VALID_FEATURES}
+    
+    def post_predict(_):
+        return _thread_session().post(f"{BASE_URL}/predict", json=valid_data)
+    
+    start = time.perf_counter()
+    serial = [_SESSION.post(f"{BASE_URL}/predict", json=valid_data) for _ in range(n_requests)]
+    serial_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        concurrent = list(executor.map(post_predict, range(n_requests)))
+    concurrent_time = time.perf_counter() - start
+    
+    print(f"Tiempo serie: {serial_time:.3f}s, concurrente: {concurrent_time:.3f}s")
+    
+    assert all(r.status_code == 200 for r in serial + concurrent)
+    expected = serial[0].json()
+    for response in concurrent:
+        data = response.json()
+        assert data["prediction"] == expected["prediction"]
+        assert data["confidence"] == expected["confidence"]
+    print("✅ Predicciones concurrentes: PASSED")
+
 if __name__ == "__main__":
     print("🧪 Iniciando tests de la API...")
     try:
         test_health_check()
         test_predict_valid_data()
         test_predict_invalid_data()
+        test_predict_batch()
+        test_predict_batch_too_large()
+        test_verify()
+        test_concurrent_predict()
         print("\n🎉 Todos los tests pasaron exitosamente!")
     except Exception as e:
         print(f"\n❌ Error en tests: {e}")